@@ -14,7 +14,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """Functions for mapping circuits to (near) Clifford circuits."""
-from typing import List, Optional, Sequence, Union, Any, cast
+from typing import Dict, List, Optional, Sequence, Tuple, Union, Any, cast
 
 import numpy as np
 
@@ -28,7 +28,15 @@ from mitiq.interface import (
 
 # Z gates with these angles/exponents are Clifford gates.
 _CLIFFORD_EXPONENTS = np.array([0.0, 0.5, 1.0, 1.5])
-_CLIFFORD_ANGLES = [exponent * np.pi for exponent in _CLIFFORD_EXPONENTS]
+_CLIFFORD_ANGLES = _CLIFFORD_EXPONENTS * np.pi
+
+# Single-qubit rotations which are Clifford iff their exponent is a multiple of
+# 0.5, the same rule used by `cirq.has_stabilizer_effect` for these gates.
+_PAULI_ROTATION_GATES = (
+    cirq.ops.XPowGate,
+    cirq.ops.YPowGate,
+    cirq.ops.ZPowGate,
+)
 
 
 @atomic_one_to_many_converter
@@ -78,19 +86,15 @@ def generate_training_circuits(
         random_state = np.random.RandomState(random_state)
 
     # Find the non-Clifford operations in the circuit.
-    operations = np.array(list(circuit.all_operations()))
-    non_clifford_indices_and_ops = np.array(
-        [
-            [i, op]
-            for i, op in enumerate(operations)
-            if not cirq.has_stabilizer_effect(op)
-        ]
-    )
-    if len(non_clifford_indices_and_ops) == 0:
+    operations, non_clifford_indices = _scan_operations(circuit)
+    if len(non_clifford_indices) == 0:
         raise ValueError("Circuit is already Clifford.")
 
-    non_clifford_indices = np.int32(non_clifford_indices_and_ops[:, 0])
-    non_clifford_ops = non_clifford_indices_and_ops[:, 1]
+    non_clifford_ops = operations[non_clifford_indices]
+
+    # Replacements act on the same qubits as the operations they replace, so
+    # all training circuits share the same moment structure.
+    layout = _moment_layout(operations)
 
     # Replace (some of) the non-Clifford operations.
     near_clifford_circuits = []
@@ -103,8 +107,14 @@ def generate_training_circuits(
             random_state,
             **kwargs,
         )
-        operations[non_clifford_indices] = new_ops
-        near_clifford_circuits.append(Circuit(operations))
+        training_operations = operations.copy()
+        training_operations[non_clifford_indices] = new_ops
+        near_clifford_circuits.append(
+            Circuit(
+                cirq.Moment(training_operations[i] for i in moment)
+                for moment in layout
+            )
+        )
 
     return near_clifford_circuits
 
@@ -129,11 +139,64 @@ def count_non_cliffords(circuit: Circuit) -> int:
     Args:
         circuit: Circuit to count the number of non-Clifford operations in.
     """
-    return sum(
-        not cirq.has_stabilizer_effect(op) for op in circuit.all_operations()
+    # Exponents of single-qubit Pauli rotations are checked in one NumPy pass,
+    # other operations fall back to the (slower) stabilizer effect protocol.
+    rotation_exponents: List[float] = []
+    num_non_cliffords = 0
+    for op in circuit.all_operations():
+        if isinstance(op.gate, _PAULI_ROTATION_GATES) and isinstance(
+            op.gate.exponent, (int, float)
+        ):
+            rotation_exponents.append(op.gate.exponent)
+        else:
+            num_non_cliffords += not cirq.has_stabilizer_effect(op)
+
+    return num_non_cliffords + int(
+        np.count_nonzero(np.mod(rotation_exponents, 0.5))
     )
 
 
+def _scan_operations(circuit: Circuit) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns an array of all operations in the circuit and an array of the
+    indices of the non-Clifford operations, found in a single pass.
+
+    Args:
+        circuit: Circuit to scan.
+    """
+    operations = []
+    non_clifford_indices = []
+    for i, op in enumerate(circuit.all_operations()):
+        operations.append(op)
+        if not cirq.has_stabilizer_effect(op):
+            non_clifford_indices.append(i)
+
+    return np.array(operations), np.array(non_clifford_indices, dtype=int)
+
+
+def _moment_layout(operations: np.ndarray) -> List[List[int]]:
+    """Returns, for each moment of ``Circuit(operations)``, the indices in
+    ``operations`` of the operations in that moment.
+
+    Placing operations into moments is the most expensive part of building a
+    circuit, and it only depends on the qubits each operation acts on. The
+    layout can therefore be reused for any operations acting on the same
+    qubits, e.g. by ``Circuit(Moment(new_ops[i] for i in moment) ...)``.
+
+    Args:
+        operations: Array of operations to lay out into moments.
+    """
+    # The same operation object can occur several times. Its occurrences act
+    # on the same qubits, so they are placed into moments in order.
+    positions: Dict[int, List[int]] = {}
+    for i, op in enumerate(operations):
+        positions.setdefault(id(op), []).append(i)
+
+    return [
+        [positions[id(op)].pop(0) for op in moment]
+        for moment in Circuit(operations)
+    ]
+
+
 def _map_to_near_clifford(
     non_clifford_ops: Sequence[cirq.ops.Operation],
     fraction_non_clifford: float,
@@ -181,20 +244,19 @@ def _map_to_near_clifford(
         random_state,
     )
 
-    # Return sequence of (near) Clifford operations.
-    return [
-        cast(List[cirq.ops.Operation], clifford_ops).pop(0)
-        if i in indices_of_selected_ops
-        else op
-        for (i, op) in enumerate(non_clifford_ops)
-    ]
+    # Return sequence of (near) Clifford operations. A new list is built so
+    # that neither input sequence is modified.
+    near_clifford_ops = list(non_clifford_ops)
+    for i, op in zip(indices_of_selected_ops, clifford_ops):
+        near_clifford_ops[i] = op
+    return near_clifford_ops
 
 
 def _select(
     non_clifford_ops: Sequence[cirq.ops.Operation],
     fraction_non_clifford: float,
     method: str = "uniform",
-    sigma: Optional[float] = 1.0,
+    sigma: float = 1.0,
     random_state: Optional[np.random.RandomState] = None,
 ) -> List[int]:
     """Returns indices of non-Clifford operations selected (to be replaced)
@@ -227,7 +289,7 @@ def _select(
             ]
         )
         probabilities = _angle_to_proximity(non_clifford_angles, sigma)
-        distribution = [k / sum(probabilities) for k in probabilities]
+        distribution = probabilities / np.sum(probabilities)
     else:
         raise ValueError(
             f"Arg `method_select` must be 'uniform' or 'gaussian' but was "
@@ -278,7 +340,7 @@ def _replace(
         [op.gate.exponent * np.pi for op in non_clifford_ops]  # type: ignore
     )
     if method == "closest":
-        clifford_angles = _closest_clifford(non_clifford_angles)
+        clifford_angles = _closest_clifford(non_clifford_angles, random_state)
 
     elif method == "uniform":
         clifford_angles = _random_clifford(
@@ -314,93 +376,122 @@ def _random_clifford(
         num_angles: Number of Clifford angles to return in array.
         random_state: Random state for sampling.
     """
-    return np.array(
-        [random_state.choice(_CLIFFORD_ANGLES) for _ in range(num_angles)]
-    )
+    return random_state.choice(_CLIFFORD_ANGLES, size=num_angles)
 
 
-@np.vectorize
-def _closest_clifford(angles: np.ndarray) -> float:
-    """Returns the nearest Clifford angles to the input angles.
+def _closest_clifford(
+    angles: np.ndarray, random_state: Optional[np.random.RandomState] = None,
+) -> np.ndarray:
+    """Returns the nearest Clifford angles to the input angles. Angles which
+    are equidistant from two Clifford angles are mapped to one of them at
+    random.
 
     Args:
-        non_Clifford_ops: Non-Clifford opperations.
+        angles: Non-Clifford angle(s).
+        random_state: Random state for breaking ties.
     """
-    ang_scaled = angles / (np.pi / 2)
-    # if just one min value, return the corresponding nearest cliff.
-    if (
-        abs((ang_scaled / 0.5) - 1) > 10 ** (-6)
-        and abs((ang_scaled / 0.5) - 3) > 10 ** (-6)
-        and (abs((ang_scaled / 0.5) - 5) > 10 ** (-6))
-    ):
-        index = int(np.round(ang_scaled)) % 4
-        return _CLIFFORD_ANGLES[index]
+    if random_state is None:
+        random_state = np.random
+
+    ang_scaled = np.asarray(angles, dtype=np.float64) / (np.pi / 2)
+    indices = np.round(ang_scaled)
+
     # If equidistant between two Clifford angles, randomly choose one.
-    else:
-        index_list = [ang_scaled - 0.5, ang_scaled + 0.5]
-        index = int(np.random.choice(index_list))
-        return _CLIFFORD_ANGLES[index]
+    ties = np.abs(ang_scaled - np.floor(ang_scaled) - 0.5) <= 5 * 10 ** (-7)
+    if np.any(ties):
+        indices = np.where(
+            ties,
+            np.floor(ang_scaled)
+            + cast(np.random.RandomState, random_state).randint(
+                2, size=ang_scaled.shape
+            ),
+            indices,
+        )
+
+    return _CLIFFORD_ANGLES[indices.astype(int) % 4]
 
 
-@np.vectorize
-def _is_clifford_angle(angles: np.ndarray, tol: float = 10 ** -5,) -> bool:
+def _is_clifford_angle(
+    angles: Union[float, np.ndarray], tol: float = 10 ** -5,
+) -> Union[bool, np.ndarray]:
     """Function to check if a given angle is Clifford.
 
     Args:
-        angles: rotation angle in the Rz gate.
+        angles: rotation angle(s) in the Rz gate.
+        tol: Absolute tolerance to the nearest Clifford angle.
+
+    Returns:
+        Boolean (array) which is True where the angle is Clifford.
     """
-    angles = angles % (2 * np.pi)
-    closest_clifford_angle = _closest_clifford(angles)
-    if abs(closest_clifford_angle - angles) < tol:
-        return True
-    return False
+    # Distance to the nearest multiple of pi / 2, computed in one pass.
+    remainders = np.mod(np.asarray(angles, dtype=np.float64), np.pi / 2)
+    return np.minimum(remainders, np.pi / 2 - remainders) < tol
 
 
-def _angle_to_proximities(angle: np.ndarray, sigma: float) -> List[float]:
+def _angle_to_proximities(
+    angle: np.ndarray, sigma: Union[float, np.ndarray]
+) -> np.ndarray:
     """Returns probability distribution based on distance from angles to
     Clifford gates.
 
     Args:
-        angle: angle to form probability distribution.
+        angle: angle(s) to form probability distribution.
 
     Returns:
         discrete value of probability distribution calculated from
         exp(-(diff/sigma)^2) where diff is the distance from each angle and the
-        Clifford gates.
+        Clifford gates. The last axis indexes the Clifford angles.
     """
-    s_matrix = cirq.unitary(cirq.S)
-    rz_matrix = cirq.unitary(cirq.rz(angle % (2 * np.pi)))
-    # TODO: Update loop / if.
-    dists = []
-    for exponent in range(4):
-        if exponent == 0:
-            exponent = 4
-        diff = np.linalg.norm(rz_matrix - s_matrix ** exponent)
-        dists.append(np.exp(-((diff / sigma) ** 2)))
-    return dists
-
-
-@np.vectorize
-def _angle_to_proximity(angle: np.ndarray, sigma: float) -> float:
+    # The Frobenius distance between Rz(angle) = diag(exp(-i angle / 2),
+    # exp(i angle / 2)) and S^k = diag(1, i^k) has the closed form below, so
+    # no unitaries are built and all angles are handled in one pass.
+    half_angles = np.mod(np.asarray(angle, dtype=np.float64), 2 * np.pi) / 2
+    half_angles = half_angles[..., np.newaxis]
+    diffs_squared = (
+        4
+        - 2 * np.cos(half_angles)
+        - 2 * np.cos(half_angles - _CLIFFORD_ANGLES)
+    )
+    return np.exp(-diffs_squared / sigma ** 2)
+
+
+def _angle_to_proximities_batch(
+    angles: np.ndarray, sigmas: np.ndarray
+) -> np.ndarray:
+    """Returns the output of ``_angle_to_proximities`` for each width in
+    ``sigmas``, computed with a single broadcast over widths and angles.
+
+    Args:
+        angles: Angle(s) to form probability distributions.
+        sigmas: 1D array of widths of the probability distributions.
+
+    Returns:
+        Array of shape (len(sigmas), *np.shape(angles), 4).
+    """
+    sigmas = np.asarray(sigmas, dtype=np.float64)
+    return _angle_to_proximities(
+        angles, sigmas.reshape(sigmas.shape + (1,) * (np.ndim(angles) + 1))
+    )
+
+
+def _angle_to_proximity(angle: np.ndarray, sigma: float) -> np.ndarray:
     """Returns probability distribution based on distance from angles to
     Clifford gates.
 
     Args:
-        angle: angle to form probability distribution.
+        angle: angle(s) to form probability distribution.
 
     Returns:
         discrete value of probability distribution calculated from
         exp(-(dist/sigma)^2) where dist = sum(dists) is the
         sum of distances from each Clifford gate.
     """
-    dists = _angle_to_proximities(angle, sigma)
-    return np.max(dists)
+    return np.max(_angle_to_proximities(angle, sigma), axis=-1)
 
 
-@np.vectorize
 def _probabilistic_angle_to_clifford(
     angles: np.ndarray, sigma: float, random_state: np.random.RandomState,
-) -> float:
+) -> np.ndarray:
     """Returns a Clifford angle sampled from the distribution
 
                         prob = exp(-(dist/sigma)^2)
@@ -411,11 +502,52 @@ def _probabilistic_angle_to_clifford(
     Args:
         angles: Non-Clifford angles.
         sigma: Width of probability distribution.
+        random_state: Random state for sampling.
     """
+    return _sample_clifford_angles(
+        _angle_to_proximities(angles, sigma), random_state
+    )
 
-    dists = _angle_to_proximities(angles, sigma)
 
-    cliff_ang = random_state.choice(
-        _CLIFFORD_ANGLES, 1, replace=False, p=np.array(dists) / np.sum(dists)
+def _probabilistic_angle_to_clifford_batch(
+    angles: np.ndarray,
+    sigmas: np.ndarray,
+    random_state: np.random.RandomState,
+) -> np.ndarray:
+    """Returns the output of ``_probabilistic_angle_to_clifford`` for each
+    width in ``sigmas``, as an array of shape (len(sigmas), *angles.shape).
+
+    Args:
+        angles: Non-Clifford angles.
+        sigmas: 1D array of widths of the probability distributions.
+        random_state: Random state for sampling.
+    """
+    return _sample_clifford_angles(
+        _angle_to_proximities_batch(angles, sigmas), random_state
     )
-    return cliff_ang
+
+
+def _sample_clifford_angles(
+    proximities: np.ndarray, random_state: np.random.RandomState
+) -> np.ndarray:
+    """Returns Clifford angles sampled with probabilities proportional to
+    ``proximities``, whose last axis indexes the Clifford angles.
+
+    Args:
+        proximities: Unnormalized probabilities of each Clifford angle.
+        random_state: Random state for sampling.
+
+    Raises:
+        ValueError: If all proximities of an angle are zero, so that its
+            probabilities cannot be normalized.
+    """
+    # Inverse transform sampling for all angles at once. This consumes the
+    # random state exactly as one `random_state.choice` call per angle would.
+    cdf = np.cumsum(proximities, axis=-1)
+    if not np.all(cdf[..., -1] > 0):
+        raise ValueError(
+            "All Clifford proximities underflowed to zero; increase sigma."
+        )
+    cdf /= cdf[..., -1:]
+    samples = random_state.random_sample(cdf.shape[:-1] + (1,))
+    return _CLIFFORD_ANGLES[np.sum(cdf <= samples, axis=-1)]
@@ -16,6 +16,7 @@
 """Tests for generating (near) Clifford circuits."""
 import pytest
 import numpy as np
+import sympy
 
 import cirq
 from cirq.circuits import Circuit
@@ -26,13 +27,17 @@ from mitiq.cdr.clifford_training_data import (
     _is_clifford_angle,
     is_clifford,
     _map_to_near_clifford,
+    _moment_layout,
     _select,
     _replace,
+    _scan_operations,
     _closest_clifford,
     _random_clifford,
     _angle_to_proximity,
     _angle_to_proximities,
+    _angle_to_proximities_batch,
     _probabilistic_angle_to_clifford,
+    _probabilistic_angle_to_clifford_batch,
     count_non_cliffords,
     generate_training_circuits,
     _CLIFFORD_ANGLES,
@@ -135,6 +140,37 @@ def test_map_to_near_clifford():
     assert new_ops == expected_ops
 
 
+def test_moment_layout():
+    a, b = cirq.LineQubit.range(2)
+    op = cirq.rz(0.1).on(a)
+    operations = [op, cirq.rz(0.2).on(b), op, cirq.CNOT.on(a, b), op]
+
+    layout = _moment_layout(operations)
+    assert layout == [[0, 1], [2], [3], [4]]
+    assert Circuit(
+        cirq.Moment(operations[i] for i in moment) for moment in layout
+    ) == Circuit(operations)
+
+
+@pytest.mark.parametrize("method", ("uniform", "gaussian"))
+def test_select_and_map_to_near_clifford_do_not_modify_input(method):
+    q = cirq.LineQubit(0)
+    ops = [cirq.ops.rz(a).on(q) for a in np.linspace(0.1, 1.0, 6)]
+    ops_before = list(ops)
+
+    _select(ops, 0.5, method=method, random_state=np.random.RandomState(1))
+    assert ops == ops_before
+
+    _map_to_near_clifford(
+        ops,
+        fraction_non_clifford=0.5,
+        method_select=method,
+        method_replace="closest",
+        random_state=np.random.RandomState(1),
+    )
+    assert ops == ops_before
+
+
 def test_generate_training_circuits_bad_methods():
     with pytest.raises(ValueError):
         generate_training_circuits(
@@ -162,22 +198,31 @@ def test_generate_training_circuits_with_clifford_circuit():
         )
 
 
+@pytest.fixture(scope="module")
+def mega_circuit():
+    """Returns a random circuit and its number of non-Clifford operations,
+    built once and shared by all parametrizations of the mega test below.
+    """
+    circuit = random_x_z_cnot_circuit(qubits=4, n_moments=10, random_state=1)
+    return circuit, count_non_cliffords(circuit)
+
+
 @pytest.mark.parametrize("method_select", ["uniform", "gaussian"])
 @pytest.mark.parametrize("method_replace", ["uniform", "gaussian", "closest"])
 @pytest.mark.parametrize(
     "kwargs", [{}, {"sigma_select": 0.5, "sigma_replace": 0.5}]
 )
 def test_generate_training_circuits_mega(
-    method_select, method_replace, kwargs
+    mega_circuit, method_select, method_replace, kwargs
 ):
-    circuit = random_x_z_cnot_circuit(qubits=4, n_moments=10, random_state=1)
+    circuit, num_non_cliffords = mega_circuit
     num_train = 10
     fraction_non_clifford = 0.1
 
     train_circuits = generate_training_circuits(
         circuit,
         num_training_circuits=num_train,
-        fraction_non_clifford=0.1,
+        fraction_non_clifford=fraction_non_clifford,
         random_state=np.random.RandomState(13),
         method_select=method_select,
         method_replace=method_replace,
@@ -185,11 +230,13 @@ def test_generate_training_circuits_mega(
     )
     assert len(train_circuits) == num_train
 
+    expected_qubits = set(circuit.all_qubits())
+    expected_non_cliffords = int(
+        round(fraction_non_clifford * num_non_cliffords)
+    )
     for train_circuit in train_circuits:
-        assert set(train_circuit.all_qubits()) == set(circuit.all_qubits())
-        assert count_non_cliffords(train_circuit) == int(
-            round(fraction_non_clifford * count_non_cliffords(circuit))
-        )
+        assert set(train_circuit.all_qubits()) == expected_qubits
+        assert count_non_cliffords(train_circuit) == expected_non_cliffords
 
 
 @pytest.mark.parametrize("method", ["uniform", "gaussian"])
@@ -229,10 +276,43 @@ def test_count_non_cliffords(circuit_type):
     assert count_non_cliffords(circuit) == 2
 
 
+def test_scan_operations():
+    a, b = cirq.LineQubit.range(2)
+    circuit = Circuit(
+        cirq.rz(0.0).on(a),  # Clifford.
+        cirq.rx(0.1 * np.pi).on(b),  # Non-Clifford.
+        cirq.CNOT.on(a, b),  # Clifford.
+        cirq.rz(0.4 * np.pi).on(b),  # Non-Clifford.
+    )
+    operations, non_clifford_indices = _scan_operations(circuit)
+
+    assert list(operations) == list(circuit.all_operations())
+    assert np.array_equal(non_clifford_indices, [1, 3])
+
+    operations, non_clifford_indices = _scan_operations(Circuit())
+    assert len(operations) == len(non_clifford_indices) == 0
+
+
 def test_count_non_cliffords_empty_circuit():
     assert count_non_cliffords(Circuit()) == 0
 
 
+def test_count_non_cliffords_matches_stabilizer_effect():
+    circuit = random_x_z_cnot_circuit(qubits=4, n_moments=20, random_state=3)
+    q = cirq.LineQubit(0)
+    circuit.append(
+        [
+            cirq.Y.on(q) ** 0.25,
+            cirq.Y.on(q) ** -0.5,
+            cirq.Z.on(q) ** sympy.Symbol("theta"),
+            cirq.T.on(q),
+        ]
+    )
+    assert count_non_cliffords(circuit) == sum(
+        not cirq.has_stabilizer_effect(op) for op in circuit.all_operations()
+    )
+
+
 def test_is_clifford_angle():
     for p in range(4):
         assert _is_clifford_angle(p * np.array(_CLIFFORD_ANGLES)).all()
@@ -240,6 +320,13 @@ def test_is_clifford_angle():
     assert not _is_clifford_angle(-0.17)
 
 
+def test_is_clifford_angle_array():
+    angles = np.array([0.0, -np.pi / 2, 2 * np.pi - 1e-8, 0.3, 3.0])
+    assert np.array_equal(
+        _is_clifford_angle(angles), [True, True, True, False, False]
+    )
+
+
 def test_closest_clifford():
     for ang in _CLIFFORD_ANGLES:
         angs = np.linspace(ang - np.pi / 4 + 0.01, ang + np.pi / 4 - 0.01)
@@ -247,6 +334,24 @@ def test_closest_clifford():
             assert _closest_clifford(a) == ang
 
 
+def test_closest_clifford_array():
+    angles = np.array([0.1, -0.9, 1.5, 3.3, 4.6, 2 * np.pi + 0.2])
+    expected = np.array([0.0, 1.5 * np.pi, 0.5 * np.pi, np.pi, 1.5 * np.pi, 0])
+    assert np.allclose(_closest_clifford(angles), expected)
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 7, -1])
+def test_closest_clifford_ties(k):
+    angles = np.full(100, k * np.pi / 4)
+    closest = _closest_clifford(angles, np.random.RandomState(1))
+
+    neighbors = {
+        _CLIFFORD_ANGLES[(k - 1) // 2 % 4],
+        _CLIFFORD_ANGLES[(k + 1) // 2 % 4],
+    }
+    assert set(closest) == neighbors
+
+
 def test_random_clifford():
     assert set(_random_clifford(20, np.random.RandomState(1))).issubset(
         _CLIFFORD_ANGLES
@@ -254,10 +359,31 @@ def test_random_clifford():
 
 
 def test_angle_to_proximities():
-    for sigma in np.linspace(0.1, 2, 10):
-        for ang in _CLIFFORD_ANGLES:
-            probabilities = _angle_to_proximities(ang, sigma)
-            assert (isinstance(p, float) for p in probabilities)
+    sigmas = np.linspace(0.1, 2, 10)
+    probabilities = _angle_to_proximities_batch(_CLIFFORD_ANGLES, sigmas)
+    assert probabilities.shape == (10, 4, 4)
+    assert np.all((probabilities > 0) & (probabilities <= 1))
+
+    for sigma, batch in zip(sigmas, probabilities):
+        for ang, expected in zip(_CLIFFORD_ANGLES, batch):
+            assert np.allclose(_angle_to_proximities(ang, sigma), expected)
+
+
+def test_angle_to_proximities_matches_frobenius_distance():
+    sigma = 0.7
+    angles = np.random.RandomState(2).uniform(-10, 10, size=20)
+
+    proximities = _angle_to_proximities(angles, sigma)
+    assert proximities.shape == (len(angles), len(_CLIFFORD_ANGLES))
+
+    s_matrix = cirq.unitary(cirq.S)
+    for angle, proximity in zip(angles, proximities):
+        rz_matrix = cirq.unitary(cirq.rz(angle % (2 * np.pi)))
+        expected = [
+            np.exp(-((np.linalg.norm(rz_matrix - s_matrix ** k) / sigma) ** 2))
+            for k in (4, 1, 2, 3)
+        ]
+        assert np.allclose(proximity, expected)
 
 
 def test_angle_to_proximity():
@@ -272,3 +398,29 @@ def test_probabilistic_angles_to_clifford():
             _CLIFFORD_ANGLES, sigma, np.random.RandomState(1)
         )
         assert all(a in _CLIFFORD_ANGLES for a in angles)
+
+
+def test_probabilistic_angles_to_clifford_batch():
+    sigmas = np.linspace(0.1, 2, 10)
+    angles = np.random.RandomState(3).uniform(0, 2 * np.pi, size=7)
+
+    batch = _probabilistic_angle_to_clifford_batch(
+        angles, sigmas, np.random.RandomState(1)
+    )
+    assert batch.shape == (len(sigmas), len(angles))
+    assert set(batch.flatten()).issubset(_CLIFFORD_ANGLES)
+
+    random_state = np.random.RandomState(1)
+    for sigma, expected in zip(sigmas, batch):
+        assert np.array_equal(
+            _probabilistic_angle_to_clifford(angles, sigma, random_state),
+            expected,
+        )
+
+
+def test_probabilistic_angle_to_clifford_all_proximities_zero():
+    # With a very small width every proximity underflows to zero.
+    with pytest.raises(ValueError, match="underflowed to zero"):
+        _probabilistic_angle_to_clifford(
+            np.array([np.pi / 4, 1.0]), 0.01, np.random.RandomState(1)
+        )
@@ -13,10 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import copy
-from typing import Callable, cast, List, Optional, Set
+from typing import Callable, cast, Dict, List, Optional, Set, Tuple
 
 import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix, diags
 import cirq
 
 from mitiq.observable.pauli import PauliString, PauliStringCollection
@@ -29,6 +29,8 @@ class Observable:
         self._paulis = list(paulis)
         self._groups: List[PauliStringCollection]
         self._ngroups: int
+        self._qubit_indices: Optional[Tuple[int, ...]] = None
+        self._matrix_cache: Dict[type, csr_matrix] = {}
         self.partition()
 
     @staticmethod
@@ -55,7 +57,12 @@ class Observable:
 
     @property
     def qubit_indices(self) -> List[int]:
-        return [cast(cirq.LineQubit, q).x for q in sorted(self._qubits())]
+        # The PauliStrings don't change, so only compute the indices once.
+        if self._qubit_indices is None:
+            self._qubit_indices = tuple(
+                cast(cirq.LineQubit, q).x for q in sorted(self._qubits())
+            )
+        return list(self._qubit_indices)
 
     @property
     def nqubits(self) -> int:
@@ -70,11 +77,22 @@ class Observable:
         return self._ngroups
 
     def partition(self, seed: Optional[int] = None) -> None:
-        rng = np.random.RandomState(seed)
-
+        """Greedily partitions the PauliStrings into groups which can be
+        measured simultaneously.
+
+        Args:
+            seed: If None, PauliStrings are added to groups in order of
+                decreasing weight, which is deterministic and tends to yield
+                fewer groups. Otherwise, they are added in a random order
+                determined by the seed.
+        """
         psets: List[PauliStringCollection] = []
-        paulis = copy.deepcopy(self._paulis)
-        rng.shuffle(paulis)
+        paulis = list(self._paulis)
+        if seed is None:
+            # PauliStrings are popped from the end, so the largest go last.
+            paulis.sort(key=lambda pauli: pauli.weight())
+        else:
+            np.random.RandomState(seed).shuffle(paulis)
 
         while paulis:
             pauli = paulis.pop()
@@ -100,17 +118,74 @@ class Observable:
         dtype: type = np.complex128,
     ) -> np.ndarray:
         """Returns the (potentially very large) matrix of the Observable."""
-        if qubit_indices is None:
-            qubit_indices = self.qubit_indices
-        n = len(qubit_indices)
+        return self._matrix_sparse(qubit_indices, dtype).toarray()
+
+    def matrix_sparse(
+        self,
+        qubit_indices: Optional[List[int]] = None,
+        dtype: type = np.complex128,
+    ) -> csr_matrix:
+        """Returns the matrix of the Observable as a sparse (CSR) matrix.
 
-        matrix = np.zeros(shape=(2 ** n, 2 ** n), dtype=dtype)
-        for pauli in self._paulis:
-            matrix += pauli.matrix(
-                qubit_indices_to_include=qubit_indices
-            ).astype(dtype=dtype)
+        Each PauliString contributes at most 2^n nonzero entries, so this
+        avoids ever forming dense 2^n x 2^n matrices for individual terms.
+        """
+        return self._matrix_sparse(qubit_indices, dtype).copy()
 
-        return matrix
+    def _matrix_sparse(
+        self,
+        qubit_indices: Optional[List[int]] = None,
+        dtype: type = np.complex128,
+    ) -> csr_matrix:
+        """Returns the sparse matrix of the Observable without copying it.
+
+        The PauliStrings don't change, so the matrix on the Observable's own
+        qubits is only assembled once per ``dtype``. Matrices on other qubits
+        are not cached. Callers must not modify the result.
+        """
+        if (
+            qubit_indices is not None
+            and list(qubit_indices) != self.qubit_indices
+        ):
+            return self._assemble_matrix_sparse(qubit_indices, dtype)
+
+        if dtype not in self._matrix_cache:
+            self._matrix_cache[dtype] = self._assemble_matrix_sparse(
+                self.qubit_indices, dtype
+            )
+        return self._matrix_cache[dtype]
+
+    def _assemble_matrix_sparse(
+        self, qubit_indices: List[int], dtype: type
+    ) -> csr_matrix:
+        dim = 2 ** len(qubit_indices)
+
+        if not self._paulis:
+            return csr_matrix((dim, dim), dtype=dtype)
+
+        if all(pauli._bitmasks()[0] == 0 for pauli in self._paulis):
+            # Only I and Z terms, so the matrix is diagonal and the terms can
+            # be summed directly without sorting duplicate COO entries.
+            diagonal = np.zeros(dim, dtype=np.complex128)
+            for pauli in self._paulis:
+                diagonal += pauli._sparse_matrix_entries(qubit_indices)[2]
+            return diags(diagonal, format="csr", dtype=dtype)
+
+        rows, cols, values = zip(
+            *(
+                pauli._sparse_matrix_entries(qubit_indices)
+                for pauli in self._paulis
+            )
+        )
+        # Duplicate entries are summed when converting to CSR.
+        return coo_matrix(
+            (
+                np.concatenate(values),
+                (np.concatenate(rows), np.concatenate(cols)),
+            ),
+            shape=(dim, dim),
+            dtype=dtype,
+        ).tocsr()
 
     def expectation(
         self, circuit: QPROGRAM, execute: Callable[[QPROGRAM], QuantumResult]
@@ -130,7 +205,7 @@ class Observable:
     def _expectation_from_density_matrix(
         self, density_matrix: np.ndarray
     ) -> float:
-        observable_matrix = self.matrix()
+        observable_matrix = self._matrix_sparse()
 
         if density_matrix.shape != observable_matrix.shape:
             nqubits = int(np.log2(density_matrix.shape[0]))
@@ -139,7 +214,8 @@ class Observable:
                 keep_indices=self.qubit_indices,
             ).reshape(observable_matrix.shape)
 
-        return cast(float, np.trace(density_matrix @ observable_matrix))
+        # Tr(rho O) = sum_ij rho_ji O_ij only needs the nonzero entries of O.
+        return cast(float, observable_matrix.multiply(density_matrix.T).sum())
 
     def __str__(self) -> str:
         return " + ".join(map(str, self._paulis))
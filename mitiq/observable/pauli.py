@@ -19,10 +19,12 @@ from typing import (
     cast,
     Counter as TCounter,
     Dict,
+    FrozenSet,
     List,
     Optional,
     Sequence,
     Set,
+    Tuple,
 )
 
 import numpy as np
@@ -77,6 +79,12 @@ class PauliString:
             ),
         )
 
+        # Measurement data depends only on the PauliString, so it is computed
+        # on first use and reused for every subsequent measurement circuit.
+        self._basis_rotations_cache: Optional[FrozenSet[cirq.Operation]] = None
+        self._qubits_to_measure_cache: Optional[FrozenSet[cirq.Qid]] = None
+        self._bitmasks_cache: Optional[Tuple[int, int]] = None
+
     @property
     def coeff(self) -> complex:
         return self._pauli.coefficient
@@ -92,18 +100,75 @@ class PauliString:
             if qubit_indices_to_include
             else self._pauli.qubits
         )
-        return self._pauli.matrix(qubits=qubits).astype(dtype=dtype)
+        return self._pauli.matrix(qubits=qubits).astype(dtype, copy=False)
+
+    def _sparse_matrix_entries(
+        self, qubit_indices: Sequence[int]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the row indices, column indices, and values of the nonzero
+        entries of the PauliString's matrix on the given qubits. As for
+        ``PauliString.matrix``, qubits not in ``qubit_indices`` are ignored.
+
+        A Pauli matrix has exactly one nonzero entry per column, which is
+        computed from the bitmasks without forming the dense matrix.
 
-    def _basis_rotations(self) -> List[cirq.Operation]:
+        Args:
+            qubit_indices: Qubits defining the matrix, the first being the
+                most significant.
+        """
+        n = len(qubit_indices)
+        xmask, zmask = self._bitmasks()
+
+        # Bitmasks with respect to the basis states of the given qubits.
+        xbits, zbits = 0, 0
+        for (k, index) in enumerate(qubit_indices):
+            bit = 1 << (n - 1 - k)
+            if xmask >> index & 1:
+                xbits |= bit
+            if zmask >> index & 1:
+                zbits |= bit
+
+        cols = np.arange(2 ** n)
+        rows = cols ^ xbits
+
+        # Z and Y give a factor -1 on |1>, and each Y = iXZ a factor i.
+        parity = np.zeros(2 ** n, dtype=int)
+        for k in range(n):
+            if zbits >> k & 1:
+                parity ^= cols >> k & 1
+        phase = self.coeff * 1j ** bin(xbits & zbits).count("1")
+        return rows, cols, phase * (1 - 2 * parity)
+
+    def _basis_rotations(self) -> FrozenSet[cirq.Operation]:
         """Returns the basis rotations needed to measure the PauliString."""
-        return [
-            op
-            for op in self._pauli.to_z_basis_ops()
-            if op.gate != cirq.SingleQubitCliffordGate.I
-        ]
+        if self._basis_rotations_cache is None:
+            self._basis_rotations_cache = frozenset(
+                op
+                for op in self._pauli.to_z_basis_ops()
+                if op.gate != cirq.SingleQubitCliffordGate.I
+            )
+        return self._basis_rotations_cache
 
-    def _qubits_to_measure(self) -> Set[cirq.Qid]:
-        return set(self._pauli.qubits)
+    def _qubits_to_measure(self) -> FrozenSet[cirq.Qid]:
+        if self._qubits_to_measure_cache is None:
+            self._qubits_to_measure_cache = frozenset(self._pauli.qubits)
+        return self._qubits_to_measure_cache
+
+    def _bitmasks(self) -> Tuple[int, int]:
+        """Returns the X and Z bitmasks of the PauliString. Bit i of the X
+        (Z) mask is set if the PauliString acts on qubit i with X or Y (Z or
+        Y).
+        """
+        if self._bitmasks_cache is None:
+            xmask, zmask = 0, 0
+            for qubit, pauli in self._pauli.items():
+                bit = 1 << cast(cirq.LineQubit, qubit).x
+                if pauli in (cirq.X, cirq.Y):
+                    xmask |= bit
+                if pauli in (cirq.Z, cirq.Y):
+                    zmask |= bit
+            self._bitmasks_cache = (xmask, zmask)
+        return self._bitmasks_cache
 
     def measure_in(self, circuit: QPROGRAM) -> QPROGRAM:
         return PauliStringCollection(self).measure_in(circuit)
@@ -115,15 +180,7 @@ class PauliString:
         Args:
             other: The PauliString to check simultaneous measurement with.
         """
-        overlap = set(self._pauli.qubits).intersection(
-            set(other._pauli.qubits)
-        )
-        for qubit in overlap:
-            if cirq.I in (self._pauli.get(qubit), other._pauli.get(qubit)):
-                continue
-            if self._pauli.get(qubit) != other._pauli.get(qubit):
-                return False
-        return True
+        return _qubitwise_commute(*self._bitmasks(), *other._bitmasks())
 
     def support(self) -> Set[int]:
         return {q.x for q in self._pauli.qubits}
@@ -189,10 +246,22 @@ class PauliStringCollection:
             >>> print(pcol.can_add(PauliString(spec="Z")))  # False.
         """
         self._paulis_by_weight: Dict[int, TCounter[PauliString]] = dict()
+        # Unions of the bitmasks of all elements. On qubits where the elements
+        # qubit-wise commute, these describe the single-qubit basis the qubit
+        # is measured in, so compatibility is checked against them alone.
+        self._xmask = 0
+        self._zmask = 0
+        # Qubits on which elements act with different non-identity Paulis,
+        # which is possible if added with ``check_precondition=False``. No
+        # non-identity Pauli on such a qubit commutes with all elements.
+        self._mixedmask = 0
         self.add(*paulis, check_precondition=check_precondition)
 
     def can_add(self, pauli: PauliString) -> bool:
-        return all(pauli.can_be_measured_with(p) for p in self.elements)
+        xmask, zmask = pauli._bitmasks()
+        if (xmask | zmask) & self._mixedmask:
+            return False
+        return _qubitwise_commute(xmask, zmask, self._xmask, self._zmask)
 
     def add(
         self, *paulis: PauliString, check_precondition: bool = True
@@ -202,6 +271,15 @@ class PauliStringCollection:
                 raise ValueError(
                     f"Cannot add PauliString {pauli} to PauliStringCollection."
                 )
+            xmask, zmask = pauli._bitmasks()
+            self._mixedmask |= (
+                ((xmask ^ self._xmask) | (zmask ^ self._zmask))
+                & (xmask | zmask)
+                & (self._xmask | self._zmask)
+            )
+            self._xmask |= xmask
+            self._zmask |= zmask
+
             weight = pauli.weight()
             if self._paulis_by_weight.get(weight) is None:
                 self._paulis_by_weight[weight] = Counter({pauli})
@@ -243,32 +321,32 @@ class PauliStringCollection:
     def _measure_in(
         circuit: cirq.Circuit, paulis: "PauliStringCollection"
     ) -> cirq.Circuit:
-        # Transform circuit to canonical qubit layout.
-        qubit_map = dict(
-            zip(
-                sorted(circuit.all_qubits()),
-                cirq.LineQubit.range(len(circuit.all_qubits())),
-            )
-        )
-        circuit = circuit.transform_qubits(lambda q: qubit_map[q])
+        # Map from the canonical qubit layout the PauliStrings act on to the
+        # qubits of the circuit. Only the (few) appended operations are
+        # transformed, so the input circuit is never copied qubit-by-qubit.
+        qubits = sorted(circuit.all_qubits())
+        qubit_map = dict(zip(cirq.LineQubit.range(len(qubits)), qubits))
 
-        if not paulis._qubits_to_measure().issubset(set(circuit.all_qubits())):
+        if not paulis._qubits_to_measure().issubset(set(qubit_map.keys())):
             raise ValueError(
                 f"Qubit mismatch. The PauliString(s) act on qubits "
                 f"{paulis.support()} but the circuit has qubit indices "
-                f"{sorted([q for q in circuit.all_qubits()])}."
+                f"{sorted(qubit_map.keys())}."
             )
 
-        basis_rotations = set()
-        support = set()
+        basis_rotations: Set[cirq.Operation] = set()
+        support: Set[cirq.Qid] = set()
         for pauli in paulis.elements:
-            basis_rotations.update(pauli._basis_rotations())
-            support.update(pauli._qubits_to_measure())
-        measured = circuit + basis_rotations + cirq.measure(*sorted(support))
+            basis_rotations |= pauli._basis_rotations()
+            support |= pauli._qubits_to_measure()
 
-        # Transform circuit back to original qubits.
-        reverse_qubit_map = dict(zip(qubit_map.values(), qubit_map.keys()))
-        return measured.transform_qubits(lambda q: reverse_qubit_map[q])
+        measurement_ops = list(basis_rotations) + [
+            cirq.measure(*sorted(support))
+        ]
+        return circuit + [
+            op.transform_qubits(lambda q: qubit_map[q])
+            for op in measurement_ops
+        ]
 
     def _expectation_from_measurements(
         self, measurements: MeasurementResult
@@ -292,3 +370,14 @@ class PauliStringCollection:
 
     def __str__(self) -> str:
         return " + ".join(map(str, self.elements))
+
+
+def _qubitwise_commute(
+    xmask1: int, zmask1: int, xmask2: int, zmask2: int
+) -> bool:
+    """Returns True if the PauliStrings with the given X and Z bitmasks (see
+    ``PauliString._bitmasks``) act with the same Pauli on every qubit they
+    both act on non-trivially, i.e., if they qubit-wise commute.
+    """
+    overlap = (xmask1 | zmask1) & (xmask2 | zmask2)
+    return overlap & ((xmask1 ^ xmask2) | (zmask1 ^ zmask2)) == 0
@@ -17,6 +17,7 @@ import functools
 import pytest
 
 import numpy as np
+from scipy.sparse import csr_matrix
 import cirq
 
 from mitiq.observable.observable import Observable
@@ -36,6 +37,7 @@ yrotation = cirq.SingleQubitCliffordGate.X_sqrt
 # Pauli matrices.
 imat = np.identity(2)
 xmat = cirq.unitary(cirq.X)
+ymat = cirq.unitary(cirq.Y)
 zmat = cirq.unitary(cirq.Z)
 
 
@@ -55,6 +57,98 @@ def test_observable():
     assert np.allclose(obs.matrix(), correct_matrix)
 
 
+def test_observable_matrix_dtype():
+    obs = Observable(PauliString(spec="XY"), PauliString(spec="ZI"))
+
+    matrix = obs.matrix(dtype=np.complex64)
+    assert matrix.dtype == np.complex64
+    assert np.allclose(matrix, obs.matrix())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_observable_matrix_matches_dense_sum(seed):
+    rng = np.random.RandomState(seed)
+    paulis = [
+        PauliString(
+            spec="".join(rng.choice(list("IXYZ"), size=3)),
+            coeff=rng.randn() + 1j * rng.randn(),
+            support=rng.choice(5, size=3, replace=False),
+        )
+        for _ in range(6)
+    ]
+    obs = Observable(*paulis)
+
+    for qubit_indices in (None, [4, 0, 1, 2, 3], [0, 1, 2, 3, 4, 5]):
+        indices = obs.qubit_indices if qubit_indices is None else qubit_indices
+        expected = sum(
+            pauli.matrix(qubit_indices_to_include=indices) for pauli in paulis
+        )
+        assert np.allclose(obs.matrix(qubit_indices), expected)
+
+
+def test_observable_matrix_sparse():
+    obs = Observable(PauliString(spec="XZ"), PauliString(spec="YY", coeff=2))
+    sparse = obs.matrix_sparse()
+
+    assert isinstance(sparse, csr_matrix)
+    assert sparse.nnz == 8
+    assert np.allclose(sparse.toarray(), obs.matrix())
+
+
+def test_observable_matrix_diagonal():
+    obs = Observable(
+        PauliString(spec="ZZ", coeff=-1.0),
+        PauliString(spec="Z", support=(1,), coeff=0.5),
+        PauliString(spec="I", coeff=2.0),
+    )
+    expected = (
+        -np.kron(zmat, zmat)
+        + 0.5 * np.kron(imat, zmat)
+        + 2 * np.kron(imat, imat)
+    )
+
+    sparse = obs.matrix_sparse()
+    assert isinstance(sparse, csr_matrix)
+    assert sparse.nnz == 4
+    assert np.allclose(sparse.toarray(), expected)
+
+    reversed_expected = (
+        -np.kron(zmat, zmat) + 0.5 * np.kron(zmat, imat) + 2 * np.identity(4)
+    )
+    assert np.allclose(obs.matrix(qubit_indices=[1, 0]), reversed_expected)
+
+
+def test_observable_matrix_is_cached():
+    obs = Observable(PauliString(spec="XZ"), PauliString(spec="YY", coeff=2))
+
+    assert obs._matrix_sparse() is obs._matrix_sparse()
+    assert obs._matrix_sparse(dtype=np.complex64).dtype == np.complex64
+    assert obs._matrix_sparse(qubit_indices=[0, 1]) is obs._matrix_sparse()
+    assert obs._matrix_sparse(qubit_indices=[1, 0]) is not obs._matrix_sparse()
+    assert set(obs._matrix_cache) == {np.complex128, np.complex64}
+
+    # The cached matrix is not exposed, so modifying the result is safe.
+    obs.matrix_sparse().data[:] = 0.0
+    obs.matrix()[0, 0] = 1.0
+    assert np.allclose(
+        obs.matrix(), np.kron(xmat, zmat) + 2 * np.kron(ymat, ymat)
+    )
+
+
+def test_observable_expectation_from_density_matrix():
+    obs = Observable(PauliString(spec="XZ"), PauliString(spec="YY", coeff=2))
+    rho = cirq.testing.random_density_matrix(dim=4, random_state=1)
+
+    assert np.isclose(
+        obs._expectation_from_density_matrix(rho),
+        np.trace(rho @ obs.matrix()),
+    )
+
+
+def test_empty_observable_matrix():
+    assert np.allclose(Observable().matrix(), [[0.0]])
+
+
 def test_observable_from_pauli_string_collections():
     z = PauliString("Z")
     zz = PauliString("ZZ")
@@ -81,6 +175,25 @@ def test_observable_partition_one_set():
     assert obs.groups[0] == PauliStringCollection(pauli1, pauli2, pauli3)
 
 
+def test_observable_partition_does_not_copy_paulis():
+    pauli1 = PauliString(spec="ZI")
+    pauli2 = PauliString(spec="IZ")
+    obs = Observable(pauli1, pauli2)
+
+    elements = obs.groups[0].elements
+    assert any(pauli is pauli1 for pauli in elements)
+    assert any(pauli is pauli2 for pauli in elements)
+
+
+def test_observable_qubit_indices_cannot_be_mutated():
+    obs = Observable(PauliString(spec="XZ", support=(2, 5)))
+    indices = obs.qubit_indices
+    indices.append(7)
+
+    assert obs.qubit_indices == [2, 5]
+    assert obs.nqubits == 2
+
+
 def test_observable_partition_single_qubit_paulis():
     x = PauliString(spec="X")
     y = PauliString(spec="Y")
@@ -97,6 +210,26 @@ def test_observable_partition_single_qubit_paulis():
     assert obs.groups == expected_groups
 
 
+def test_observable_partition_deterministic_without_seed():
+    paulis = [
+        PauliString(spec="ZI"),
+        PauliString(spec="IX"),
+        PauliString(spec="XX"),
+        PauliString(spec="ZZ"),
+    ]
+    obs = Observable(*paulis)
+    groups = obs.groups
+
+    for _ in range(5):
+        obs.partition()
+        assert obs.groups == groups
+
+    # Largest-weight PauliStrings are grouped first.
+    assert obs.ngroups == 2
+    assert obs.groups[0] == PauliStringCollection(paulis[0], paulis[3])
+    assert obs.groups[1] == PauliStringCollection(paulis[1], paulis[2])
+
+
 def test_observable_partition_can_be_measured_with():
     n = 10
     nterms = 50
@@ -139,6 +139,19 @@ def test_pauli_measure_in_circuit(support, circuit_type):
             assert measured == expected
 
 
+def test_pauli_measure_in_does_not_modify_input_circuit():
+    qreg = cirq.GridQubit.rect(1, 3)
+    circuit = cirq.Circuit(cirq.H.on_each(qreg))
+    circuit_copy = circuit.copy()
+
+    measured = PauliString(spec="XZ", support=(0, 2)).measure_in(circuit)
+    assert circuit == circuit_copy
+    assert measured != circuit
+
+    measured.append(cirq.X.on_each(qreg))
+    assert circuit == circuit_copy
+
+
 def test_pauli_measure_in_bad_qubits_error():
     n = 5
     pauli = PauliString(spec="X" * n)
@@ -148,6 +161,19 @@ def test_pauli_measure_in_bad_qubits_error():
         pauli.measure_in(circuit)
 
 
+def test_pauli_basis_rotations_and_qubits_to_measure():
+    a, b, c = cirq.LineQubit.range(3)
+    pauli = PauliString(spec="XYZ")
+
+    assert pauli._basis_rotations() == {xrotation.on(a), yrotation.on(b)}
+    assert pauli._qubits_to_measure() == {a, b, c}
+    assert pauli._basis_rotations() is pauli._basis_rotations()
+
+    product = PauliString(spec="X") * PauliString(spec="Z", support=(1,))
+    assert product._basis_rotations() == {xrotation.on(a)}
+    assert product._qubits_to_measure() == {a, b}
+
+
 def test_can_be_measured_with_single_qubit():
     pauli = PauliString(spec="Z")
 
@@ -178,6 +204,60 @@ def test_can_be_measured_with_non_overlapping_paulis():
     assert pauli.can_be_measured_with(PauliString(spec="IIYZ"))
 
 
+def test_bitmasks():
+    assert PauliString(spec="I")._bitmasks() == (0, 0)
+    assert PauliString(spec="XYZ")._bitmasks() == (0b011, 0b110)
+    assert PauliString(spec="ZX", support=(3, 70))._bitmasks() == (
+        1 << 70,
+        1 << 3,
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_can_be_measured_with_matches_qubitwise_definition(seed):
+    rng = np.random.RandomState(seed)
+    n = 6
+    paulis = [
+        PauliString(spec="".join(rng.choice(list("IXYZ"), size=n)))
+        for _ in range(20)
+    ]
+    for a in paulis:
+        for b in paulis:
+            expected = all(
+                a._pauli.get(q) is None
+                or b._pauli.get(q) is None
+                or a._pauli.get(q) == b._pauli.get(q)
+                for q in cirq.LineQubit.range(n)
+            )
+            assert a.can_be_measured_with(b) == expected
+            assert PauliStringCollection(a).can_add(b) == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_can_add_without_precondition_matches_elementwise_check(seed):
+    pcol = PauliStringCollection(
+        PauliString(spec="X"), PauliString(spec="Z"), check_precondition=False
+    )
+    assert not pcol.can_add(PauliString(spec="Y"))
+    assert pcol.can_add(PauliString(spec="IZ"))
+
+    # Sparse PauliStrings, so that some of them can be added.
+    rng = np.random.RandomState(seed)
+    paulis = [
+        PauliString(
+            spec="".join(
+                rng.choice(list("IXYZ"), size=4, p=[0.55, 0.15, 0.15, 0.15])
+            )
+        )
+        for _ in range(30)
+    ]
+    pcol = PauliStringCollection(*paulis[:4], check_precondition=False)
+    for pauli in paulis[4:]:
+        assert pcol.can_add(pauli) == all(
+            pauli.can_be_measured_with(element) for element in pcol.elements
+        )
+
+
 def test_weight():
     assert PauliString(spec="I").weight() == 0
     assert PauliString(spec="Z").weight() == 1